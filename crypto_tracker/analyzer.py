@@ -6,16 +6,20 @@ logger = logging.getLogger(__name__)
 
 ALERT_THRESHOLD_PCT = 1.0
 
+ASSETS = [("BTC", "btc_usd"), ("ETH", "eth_usd")]
 
-def analyze_price_change(db: Database, current_snapshot_id: int) -> None:
-    current = db.get_latest_snapshot()
-    previous = db.get_previous_snapshot()
+
+def analyze_price_change(
+    db: Database, current_snapshot_id: int, shard_id: str = "default"
+) -> None:
+    current = db.get_latest_snapshot(shard_id)
+    previous = db.get_previous_snapshot(shard_id)
 
     if not current or not previous:
         logger.info("Not enough data for price change analysis")
         return
 
-    for asset, key in [("BTC", "btc_usd"), ("ETH", "eth_usd")]:
+    for asset, key in ASSETS:
         if current.get(key) and previous.get(key):
             change = calculate_change_pct(float(previous[key]), float(current[key]))
             if abs(change) >= ALERT_THRESHOLD_PCT:
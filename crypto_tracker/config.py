@@ -10,6 +10,12 @@ class Config:
     webhook_port: int
     webhook_secret: str
     cron_expression: str
+    shard_tiers: str
+    asset_tiers: str
+    admin_token: str
+    profile_dir: str
+    profile_every_n: int
+    profile_slow_ms: int
 
     @classmethod
     def from_env(cls) -> "Config":
@@ -32,4 +38,10 @@ class Config:
             webhook_port=webhook_port,
             webhook_secret=os.environ.get("WEBHOOK_SECRET", "my-secret-key"),
             cron_expression=os.environ.get("CRON_EXPRESSION", "* * * * *"),
+            shard_tiers=os.environ.get("SHARD_TIERS", ""),
+            asset_tiers=os.environ.get("ASSET_TIERS", ""),
+            admin_token=os.environ.get("ADMIN_TOKEN", ""),
+            profile_dir=os.environ.get("PROFILE_DIR", "profiles"),
+            profile_every_n=int(os.environ.get("PROFILE_EVERY_N", "0")),
+            profile_slow_ms=int(os.environ.get("PROFILE_SLOW_MS", "0")),
         )
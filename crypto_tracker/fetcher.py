@@ -8,6 +8,10 @@ logger = logging.getLogger(__name__)
 
 REQUEST_TIMEOUT = 10
 
+CRYPTO_IDS = {"BTC": "bitcoin", "ETH": "ethereum"}
+FIAT_CURRENCIES = ["EUR", "GBP", "JPY"]
+ALL_ASSETS = list(CRYPTO_IDS) + FIAT_CURRENCIES
+
 
 @dataclass
 class CryptoPrice:
@@ -30,27 +34,29 @@ class AggregatedData:
     raw_data: dict
 
 
-def fetch_coincap() -> Optional[CryptoPrice]:
+def fetch_coincap(assets: Optional[list] = None) -> Optional[CryptoPrice]:
+    assets = [a for a in (assets or CRYPTO_IDS) if a in CRYPTO_IDS]
     try:
-        btc_resp = requests.get("https://api.coincap.io/v2/assets/bitcoin", timeout=REQUEST_TIMEOUT)
-        btc_resp.raise_for_status()
-        btc_price = float(btc_resp.json()["data"]["priceUsd"])
-
-        eth_resp = requests.get("https://api.coincap.io/v2/assets/ethereum", timeout=REQUEST_TIMEOUT)
-        eth_resp.raise_for_status()
-        eth_price = float(eth_resp.json()["data"]["priceUsd"])
-
-        prices = CryptoPrice(btc_usd=btc_price, eth_usd=eth_price)
-        logger.info(f"CoinCap: BTC=${prices.btc_usd:.2f}, ETH=${prices.eth_usd:.2f}")
+        found = {}
+        for asset in assets:
+            resp = requests.get(
+                f"https://api.coincap.io/v2/assets/{CRYPTO_IDS[asset]}", timeout=REQUEST_TIMEOUT
+            )
+            resp.raise_for_status()
+            found[asset] = float(resp.json()["data"]["priceUsd"])
+
+        prices = CryptoPrice(btc_usd=found.get("BTC"), eth_usd=found.get("ETH"))
+        logger.info(f"CoinCap: {format_prices(prices)}")
         return prices
     except Exception as e:
         logger.error(f"CoinCap fetch failed: {e}")
         return None
 
 
-def fetch_coingecko() -> Optional[CryptoPrice]:
+def fetch_coingecko(assets: Optional[list] = None) -> Optional[CryptoPrice]:
+    assets = [a for a in (assets or CRYPTO_IDS) if a in CRYPTO_IDS]
     url = "https://api.coingecko.com/api/v3/simple/price"
-    params = {"ids": "bitcoin,ethereum", "vs_currencies": "usd"}
+    params = {"ids": ",".join(CRYPTO_IDS[a] for a in assets), "vs_currencies": "usd"}
 
     try:
         resp = requests.get(url, params=params, timeout=REQUEST_TIMEOUT)
@@ -62,14 +68,24 @@ def fetch_coingecko() -> Optional[CryptoPrice]:
             eth_usd=data.get("ethereum", {}).get("usd"),
         )
 
-        logger.info(f"CoinGecko: BTC=${prices.btc_usd:.2f}, ETH=${prices.eth_usd:.2f}")
+        logger.info(f"CoinGecko: {format_prices(prices)}")
         return prices
     except Exception as e:
         logger.error(f"CoinGecko fetch failed: {e}")
         return None
 
 
-def fetch_exchange_rates() -> Optional[ExchangeRates]:
+def format_prices(prices: CryptoPrice) -> str:
+    parts = []
+    if prices.btc_usd is not None:
+        parts.append(f"BTC=${prices.btc_usd:.2f}")
+    if prices.eth_usd is not None:
+        parts.append(f"ETH=${prices.eth_usd:.2f}")
+    return ", ".join(parts)
+
+
+def fetch_exchange_rates(currencies: Optional[list] = None) -> Optional[ExchangeRates]:
+    currencies = currencies or FIAT_CURRENCIES
     url = "https://open.er-api.com/v6/latest/USD"
 
     try:
@@ -79,9 +95,9 @@ def fetch_exchange_rates() -> Optional[ExchangeRates]:
 
         rates_data = data.get("rates", {})
         rates = ExchangeRates(
-            eur=rates_data.get("EUR"),
-            gbp=rates_data.get("GBP"),
-            jpy=rates_data.get("JPY"),
+            eur=rates_data.get("EUR") if "EUR" in currencies else None,
+            gbp=rates_data.get("GBP") if "GBP" in currencies else None,
+            jpy=rates_data.get("JPY") if "JPY" in currencies else None,
         )
 
         logger.info(f"ExchangeRates: EUR={rates.eur}, GBP={rates.gbp}, JPY={rates.jpy}")
@@ -91,15 +107,21 @@ def fetch_exchange_rates() -> Optional[ExchangeRates]:
         return None
 
 
-def fetch_all() -> AggregatedData:
+def fetch_all(assets: Optional[list] = None) -> AggregatedData:
+    assets = assets or ALL_ASSETS
+    crypto_assets = [a for a in assets if a in CRYPTO_IDS]
+    currencies = [a for a in assets if a in FIAT_CURRENCIES]
     raw_data = {}
 
-    crypto = fetch_coincap()
-    source = "coincap"
+    crypto = None
+    source = "none"
+    if crypto_assets:
+        crypto = fetch_coincap(crypto_assets)
+        source = "coincap"
 
-    if crypto is None:
-        crypto = fetch_coingecko()
-        source = "coingecko"
+        if crypto is None:
+            crypto = fetch_coingecko(crypto_assets)
+            source = "coingecko"
 
     if crypto is None:
         crypto = CryptoPrice()
@@ -109,7 +131,7 @@ def fetch_all() -> AggregatedData:
     raw_data["btc_usd"] = crypto.btc_usd
     raw_data["eth_usd"] = crypto.eth_usd
 
-    rates = fetch_exchange_rates()
+    rates = fetch_exchange_rates(currencies) if currencies else None
     if rates is None:
         rates = ExchangeRates()
 
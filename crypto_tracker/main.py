@@ -5,13 +5,18 @@ import argparse
 import json
 import logging
 import sys
+from datetime import datetime
 from pathlib import Path
 
 from dotenv import load_dotenv
 
+from analyzer import ALERT_THRESHOLD_PCT
 from config import Config
 from easycron import EasyCronClient
 from fetcher import fetch_all
+from profiler import SamplingProfiler
+from replay import DEFAULT_CHUNK_SIZE, replay
+from shards import ShardResolver, build_shards, register_shard_jobs
 from store import Database
 from webhook import create_app
 
@@ -30,27 +35,25 @@ def cmd_serve(config: Config, db: Database):
         logger.error("EasyCron server is not healthy. Is it running?")
         sys.exit(1)
 
-    existing_jobs = client.list_jobs()
-    for existing_job in existing_jobs:
-        if existing_job.get("name") == "crypto-tracker":
-            job_id = existing_job.get("id")
-            logger.info(f"Removing existing job: {job_id}")
-            client.delete_job(job_id)
-
-    job = client.register_job(
-        name="crypto-tracker",
-        cron_expression=config.cron_expression,
-        timezone="UTC",
-    )
-    if not job:
+    shards = build_shards(config)
+    jobs = register_shard_jobs(client, config, shards)
+    if not jobs:
         logger.error("Failed to register job with EasyCron")
         sys.exit(1)
 
-    logger.info(f"Job registered: {job.get('id')}")
-    logger.info(f"Cron expression: {config.cron_expression}")
+    logger.info(f"Registered {len(jobs)} job(s) for {len(shards)} shard(s)")
     logger.info(f"Webhook URL: {config.webhook_url}")
 
-    app = create_app(db, config.webhook_secret)
+    shard_resolver = ShardResolver(client, shards)
+    shard_resolver.add_jobs(jobs)
+
+    app = create_app(
+        db,
+        config.webhook_secret,
+        shard_resolver,
+        profiler=SamplingProfiler.from_config(config),
+        admin_token=config.admin_token,
+    )
     logger.info(f"Starting webhook server on port {config.webhook_port}")
 
     try:
@@ -102,6 +105,87 @@ def cmd_jobs(config: Config):
         print()
 
 
+def cmd_shards(config: Config, db: Database, args: argparse.Namespace):
+    shards = build_shards(config)
+    empty = [shard.shard_id for shard in shards if not shard.assets]
+    print(f"{len(shards)} shard(s):\n")
+    for shard in shards:
+        print(f"  Shard: {shard.shard_id}")
+        print(f"  Job: {shard.job_name}")
+        print(f"  Cron: {shard.cron_expression}")
+        print(f"  Assets: {', '.join(shard.assets) or '(none)'}")
+        print()
+
+    if empty:
+        print(f"WARNING: {len(empty)} shard(s) have no assets and are not scheduled: {', '.join(empty)}\n")
+
+    if not args.latency:
+        return
+
+    db.connect()
+    try:
+        rows = db.get_shard_latency(hours=args.hours)
+    finally:
+        db.close()
+
+    if not rows:
+        print(f"No executions in the last {args.hours}h")
+        return
+
+    print(f"Latency over the last {args.hours}h (ms):\n")
+    print(
+        f"  {'shard':<16}{'runs':>8}{'failed':>8}{'delay p50':>12}{'delay p95':>12}"
+        f"{'dur p50':>12}{'dur p95':>12}{'dur max':>12}"
+    )
+    for row in rows:
+        print(
+            f"  {row['shard_id']:<16}{row['executions']:>8}{row['failed']:>8}"
+            f"{format_ms(row['delay_p50_ms']):>12}{format_ms(row['delay_p95_ms']):>12}"
+            f"{format_ms(row['duration_p50_ms']):>12}{format_ms(row['duration_p95_ms']):>12}"
+            f"{format_ms(row['duration_max_ms']):>12}"
+        )
+
+
+def format_ms(value) -> str:
+    return "-" if value is None else f"{float(value):.0f}"
+
+
+def cmd_replay(config: Config, db: Database, args: argparse.Namespace):
+    db.connect()
+    try:
+        result = replay(
+            db,
+            thresholds=args.threshold or [ALERT_THRESHOLD_PCT],
+            since=args.since,
+            until=args.until,
+            chunk_size=args.chunk_size,
+            save_alerts=args.save_alerts,
+        )
+        print(json.dumps(result, indent=2))
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    finally:
+        db.close()
+
+
+def iso_datetime(value: str) -> datetime:
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"not an ISO 8601 date/time: {value!r}")
+
+
+def positive_int(value: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        number = 0
+    if number <= 0:
+        raise argparse.ArgumentTypeError(f"must be a positive integer: {value!r}")
+    return number
+
+
 def cmd_init_db(config: Config, db: Database):
     db.connect()
 
@@ -131,6 +215,47 @@ def main():
     subparsers.add_parser("jobs", help="List registered EasyCron jobs")
     subparsers.add_parser("init-db", help="Initialize database schema")
 
+    shards_parser = subparsers.add_parser(
+        "shards", help="Show shard assignment and per-shard latency"
+    )
+    shards_parser.add_argument(
+        "--latency", action="store_true", help="Include the per-shard latency report"
+    )
+    shards_parser.add_argument(
+        "--hours", type=int, default=24, help="Latency report window in hours (default: 24)"
+    )
+
+    replay_parser = subparsers.add_parser(
+        "replay", help="Backtest alert thresholds over stored snapshots"
+    )
+    replay_parser.add_argument(
+        "--threshold",
+        type=float,
+        action="append",
+        help=f"Alert threshold in percent, repeatable (default: {ALERT_THRESHOLD_PCT})",
+    )
+    replay_parser.add_argument(
+        "--since",
+        type=iso_datetime,
+        help="Only replay snapshots fetched at or after this ISO 8601 time",
+    )
+    replay_parser.add_argument(
+        "--until",
+        type=iso_datetime,
+        help="Only replay snapshots fetched before this ISO 8601 time",
+    )
+    replay_parser.add_argument(
+        "--chunk-size",
+        type=positive_int,
+        default=DEFAULT_CHUNK_SIZE,
+        help=f"Rows fetched per round trip (default: {DEFAULT_CHUNK_SIZE})",
+    )
+    replay_parser.add_argument(
+        "--save-alerts",
+        action="store_true",
+        help="Write the alerts to price_alerts (requires a single threshold)",
+    )
+
     args = parser.parse_args()
     if not args.command:
         parser.print_help()
@@ -147,6 +272,10 @@ def main():
         cmd_jobs(config)
     elif args.command == "init-db":
         cmd_init_db(config, db)
+    elif args.command == "shards":
+        cmd_shards(config, db, args)
+    elif args.command == "replay":
+        cmd_replay(config, db, args)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,266 @@
+import itertools
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+MAX_STACK_DEPTH = 64
+
+# Shared runtime settings, re-read by every worker when the file changes.
+SETTINGS_FILE = "settings"
+SETTINGS_CHECK_INTERVAL = 1.0
+
+
+@dataclass
+class ProfileSession:
+    thread_id: int
+    started_at: float
+    forced: bool
+    stacks: Counter = field(default_factory=Counter)
+    tags: dict = field(default_factory=dict)
+
+
+def collapse_stack(frame) -> str:
+    names = []
+    while frame is not None and len(names) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class SamplingProfiler:
+    """Samples the stacks of in-flight requests from a single background thread.
+
+    A request is kept if it is every ``every_n``-th one or took at least
+    ``slow_ms``; with both set to 0 the profiler is off and ``start`` is never
+    called, so no sampler thread runs. Settings saved through
+    ``save_settings`` go to a file in ``profile_dir`` that takes precedence
+    over the constructor values and is picked up by every process sharing
+    the directory.
+    """
+
+    def __init__(
+        self,
+        profile_dir: str,
+        every_n: int = 0,
+        slow_ms: int = 0,
+        interval_ms: int = 5,
+        keep: int = 500,
+    ):
+        self.profile_dir = Path(profile_dir)
+        self.interval_ms = interval_ms
+        self.keep = keep
+        self.every_n = 0
+        self.slow_ms = 0
+        self.enabled = False
+        self._sessions = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Condition(self._lock)
+        self._counter = itertools.count(1)
+        self._thread = None
+        self._settings_path = self.profile_dir / SETTINGS_FILE
+        self._settings_mtime = None
+        self._settings_checked_at = float("-inf")
+        self._default_settings = {"every_n": every_n, "slow_ms": slow_ms}
+        self.configure(every_n=every_n, slow_ms=slow_ms)
+        self.refresh(force=True)
+
+    @classmethod
+    def from_config(cls, config: Config) -> "SamplingProfiler":
+        return cls(
+            profile_dir=config.profile_dir,
+            every_n=config.profile_every_n,
+            slow_ms=config.profile_slow_ms,
+        )
+
+    def configure(self, every_n: Optional[int] = None, slow_ms: Optional[int] = None):
+        with self._lock:
+            if every_n is not None:
+                self.every_n = max(int(every_n), 0)
+            if slow_ms is not None:
+                self.slow_ms = max(int(slow_ms), 0)
+            self.enabled = bool(self.every_n or self.slow_ms)
+            self._wakeup.notify_all()
+        logger.info(
+            f"Profiling {'enabled' if self.enabled else 'disabled'}: "
+            f"every_n={self.every_n}, slow_ms={self.slow_ms}"
+        )
+
+    def save_settings(self, every_n: int, slow_ms: int):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self._settings_path.with_name(f".{SETTINGS_FILE}.{os.getpid()}")
+        tmp_path.write_text(json.dumps({"every_n": every_n, "slow_ms": slow_ms}))
+        os.replace(tmp_path, self._settings_path)
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._settings_checked_at < SETTINGS_CHECK_INTERVAL:
+            return
+        self._settings_checked_at = now
+
+        try:
+            mtime = self._settings_path.stat().st_mtime_ns
+        except OSError:
+            # A removed settings file falls back to the constructor values.
+            if self._settings_mtime is not None:
+                self._settings_mtime = None
+                self.configure(**self._default_settings)
+            return
+        if mtime == self._settings_mtime:
+            return
+        self._settings_mtime = mtime
+
+        try:
+            settings = json.loads(self._settings_path.read_text())
+            self.configure(every_n=settings.get("every_n"), slow_ms=settings.get("slow_ms"))
+        except (OSError, ValueError, TypeError, AttributeError) as e:
+            logger.error(f"Ignoring invalid profiler settings in {self._settings_path}: {e}")
+
+    def status(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "every_n": self.every_n,
+            "slow_ms": self.slow_ms,
+            "interval_ms": self.interval_ms,
+            "profile_dir": str(self.profile_dir),
+            "keep": self.keep,
+        }
+
+    def start(self) -> Optional[ProfileSession]:
+        every_n = self.every_n
+        forced = bool(every_n) and next(self._counter) % every_n == 0
+        if not forced and not self.slow_ms:
+            return None
+
+        session = ProfileSession(threading.get_ident(), time.monotonic(), forced)
+        with self._lock:
+            self._sessions[session.thread_id] = session
+            self._wakeup.notify_all()
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="profiler-sampler", daemon=True
+                )
+                self._thread.start()
+        return session
+
+    def stop(self, session: ProfileSession) -> Optional[Path]:
+        with self._lock:
+            self._sessions.pop(session.thread_id, None)
+
+        duration_ms = (time.monotonic() - session.started_at) * 1000
+        slow = bool(self.slow_ms) and duration_ms >= self.slow_ms
+        if not (session.forced or slow):
+            return None
+
+        try:
+            return self._write(session, duration_ms, "slow" if slow else "sampled")
+        except OSError as e:
+            logger.error(f"Failed to write profile: {e}")
+            return None
+
+    def _run(self):
+        interval = self.interval_ms / 1000
+        while True:
+            with self._wakeup:
+                # Sleep until a request is being profiled; exit once disabled.
+                while not self._sessions:
+                    if not self.enabled:
+                        self._thread = None
+                        return
+                    self._wakeup.wait()
+                sessions = list(self._sessions.items())
+
+            frames = sys._current_frames()
+            stacks = {
+                thread_id: collapse_stack(frames[thread_id])
+                for thread_id, _ in sessions
+                if thread_id in frames
+            }
+            del frames
+
+            with self._lock:
+                for thread_id, session in sessions:
+                    if thread_id in stacks and self._sessions.get(thread_id) is session:
+                        session.stacks[stacks[thread_id]] += 1
+
+            time.sleep(interval)
+
+    def _write(self, session: ProfileSession, duration_ms: float, reason: str) -> Path:
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        execution_id = str(session.tags.get("execution_id", "unknown"))
+        safe_id = re.sub(r"[^A-Za-z0-9_.-]", "_", execution_id)[:100]
+        path = self.profile_dir / f"{int(time.time() * 1000)}-{safe_id}.json"
+
+        samples = sum(session.stacks.values())
+        profile = {
+            "created_at": time.time(),
+            "reason": reason,
+            "duration_ms": round(duration_ms, 2),
+            "samples": samples,
+            # Measured, not the nominal interval: GIL contention stretches it.
+            "ms_per_sample": round(duration_ms / samples, 2) if samples else None,
+            **session.tags,
+            "stacks": dict(session.stacks),
+        }
+        path.write_text(json.dumps(profile))
+        logger.info(f"Wrote {reason} profile for execution {execution_id} ({duration_ms:.0f}ms): {path}")
+
+        self._rotate()
+        return path
+
+    def _rotate(self):
+        profiles = sorted(self.profile_dir.glob("*.json"))
+        for old in profiles[: max(len(profiles) - self.keep, 0)]:
+            old.unlink(missing_ok=True)
+
+    def summary(self, minutes: int = 60, limit: int = 20) -> dict:
+        cutoff = time.time() - minutes * 60
+        self_samples = Counter()
+        total_samples = Counter()
+        profiles = 0
+        samples = 0
+
+        for path in sorted(self.profile_dir.glob("*.json")):
+            try:
+                profile = json.loads(path.read_text())
+            except (OSError, ValueError):
+                continue
+            if profile.get("created_at", 0) < cutoff:
+                continue
+
+            profiles += 1
+            for stack, count in profile.get("stacks", {}).items():
+                frames = stack.split(";")
+                samples += count
+                self_samples[frames[-1]] += count
+                for name in set(frames):
+                    total_samples[name] += count
+
+        functions = [
+            {
+                "function": name,
+                "self_samples": count,
+                "total_samples": total_samples[name],
+                "self_pct": round(count * 100 / samples, 2),
+            }
+            for name, count in self_samples.most_common(limit)
+        ]
+        return {
+            "window_minutes": minutes,
+            "profiles": profiles,
+            "samples": samples,
+            "functions": functions,
+        }
@@ -0,0 +1,138 @@
+import logging
+from bisect import bisect_right
+from collections import Counter
+from datetime import datetime
+from typing import Optional
+
+from analyzer import ASSETS
+from store import Database
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 10000
+
+
+class _Tally:
+    """Per-asset alert tally; a change in bucket i fires for every threshold below i."""
+
+    def __init__(self, num_thresholds: int):
+        size = num_thresholds + 1
+        self.counts = [0] * size
+        self.first = [None] * size
+        self.last = [None] * size
+        self.by_month = [Counter() for _ in range(size)]
+
+    def add(self, bucket: int, fetched_at) -> None:
+        # Rows arrive grouped by shard, so time order only holds within a shard.
+        self.counts[bucket] += 1
+        first = self.first[bucket]
+        if first is None or fetched_at < first:
+            self.first[bucket] = fetched_at
+        last = self.last[bucket]
+        if last is None or fetched_at > last:
+            self.last[bucket] = fetched_at
+        self.by_month[bucket][fetched_at.strftime("%Y-%m")] += 1
+
+    def resolve(self) -> list:
+        results = []
+        count = 0
+        first = None
+        last = None
+        by_month = Counter()
+        for bucket in range(len(self.counts) - 1, 0, -1):
+            count += self.counts[bucket]
+            if self.first[bucket] is not None:
+                first = min(first, self.first[bucket]) if first else self.first[bucket]
+                last = max(last, self.last[bucket]) if last else self.last[bucket]
+            by_month.update(self.by_month[bucket])
+            results.append(
+                {
+                    "alerts": count,
+                    "first_alert_at": first.isoformat() if first else None,
+                    "last_alert_at": last.isoformat() if last else None,
+                    "by_month": dict(sorted(by_month.items())),
+                }
+            )
+        results.reverse()
+        return results
+
+
+def replay(
+    db: Database,
+    thresholds: list,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    save_alerts: bool = False,
+) -> dict:
+    thresholds = sorted(set(thresholds))
+    if save_alerts and len(thresholds) != 1:
+        raise ValueError("--save-alerts requires exactly one threshold")
+
+    # The snapshot stream holds a transaction open on db, so alerts are
+    # written and committed per chunk through a second connection.
+    writer = None
+    if save_alerts:
+        writer = Database(db.database_url)
+        writer.connect()
+
+    try:
+        return _replay(db, writer, thresholds, since, until, chunk_size)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def _replay(
+    db: Database,
+    writer: Optional[Database],
+    thresholds: list,
+    since: Optional[datetime],
+    until: Optional[datetime],
+    chunk_size: int,
+) -> dict:
+    tallies = {asset: _Tally(len(thresholds)) for asset, _ in ASSETS}
+    saved_alerts = 0
+    snapshots = 0
+
+    for rows in db.iter_snapshot_pairs(chunk_size=chunk_size, since=since, until=until):
+        snapshots += len(rows)
+        pending_alerts = []
+
+        for row in rows:
+            snapshot_id, fetched_at = row[0], row[1]
+            for i, (asset, _) in enumerate(ASSETS):
+                previous, current, change = row[2 + 3 * i : 5 + 3 * i]
+                if change is None:
+                    continue
+                bucket = bisect_right(thresholds, abs(change))
+                if bucket == 0:
+                    continue
+                tallies[asset].add(bucket, fetched_at)
+                if writer is not None:
+                    pending_alerts.append(
+                        (asset, previous, current, change, snapshot_id, fetched_at)
+                    )
+
+        if pending_alerts:
+            saved_alerts += writer.save_alerts(pending_alerts)
+
+        logger.info(f"Replayed {snapshots} snapshot(s)")
+
+    results = []
+    resolved = {asset: tally.resolve() for asset, tally in tallies.items()}
+    for i, threshold in enumerate(thresholds):
+        results.append(
+            {
+                "threshold_pct": threshold,
+                "assets": {asset: resolved[asset][i] for asset, _ in ASSETS},
+            }
+        )
+
+    return {
+        "snapshots": snapshots,
+        "since": since.isoformat() if since else None,
+        "until": until.isoformat() if until else None,
+        "saved_alerts": saved_alerts,
+        "thresholds": results,
+    }
@@ -13,6 +13,9 @@ CREATE TABLE IF NOT EXISTS price_snapshots (
 CREATE INDEX IF NOT EXISTS idx_snapshots_fetched_at ON price_snapshots(fetched_at DESC);
 CREATE INDEX IF NOT EXISTS idx_snapshots_source ON price_snapshots(source);
 
+ALTER TABLE price_snapshots ADD COLUMN IF NOT EXISTS shard_id VARCHAR(50) NOT NULL DEFAULT 'default';
+CREATE INDEX IF NOT EXISTS idx_snapshots_shard_fetched_at ON price_snapshots(shard_id, fetched_at DESC);
+
 CREATE TABLE IF NOT EXISTS price_alerts (
     id SERIAL PRIMARY KEY,
     created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
@@ -24,6 +27,7 @@ CREATE TABLE IF NOT EXISTS price_alerts (
 );
 
 CREATE INDEX IF NOT EXISTS idx_alerts_created_at ON price_alerts(created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_alerts_snapshot_asset ON price_alerts(snapshot_id, asset);
 
 CREATE TABLE IF NOT EXISTS execution_log (
     id SERIAL PRIMARY KEY,
@@ -37,3 +41,6 @@ CREATE TABLE IF NOT EXISTS execution_log (
 );
 
 CREATE INDEX IF NOT EXISTS idx_execlog_received_at ON execution_log(received_at DESC);
+
+ALTER TABLE execution_log ADD COLUMN IF NOT EXISTS shard_id VARCHAR(50) NOT NULL DEFAULT 'default';
+ALTER TABLE execution_log ADD COLUMN IF NOT EXISTS completed_at TIMESTAMPTZ;
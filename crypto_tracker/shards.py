@@ -0,0 +1,208 @@
+import hashlib
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from config import Config
+from easycron import EasyCronClient
+from fetcher import ALL_ASSETS, CRYPTO_IDS, FIAT_CURRENCIES
+
+logger = logging.getLogger(__name__)
+
+JOB_NAME = "crypto-tracker"
+DEFAULT_SHARD_ID = "default"
+
+# All fiat rates come from one upstream response, so they shard as one unit;
+# splitting them would repeat the same exchange-rate call once per shard.
+FIAT_UNIT = "FX"
+SHARD_UNITS = list(CRYPTO_IDS) + [FIAT_UNIT]
+
+JOB_REFRESH_INTERVAL = 30
+
+
+@dataclass
+class Shard:
+    shard_id: str
+    cron_expression: str
+    assets: list = field(default_factory=list)
+
+    @property
+    def job_name(self) -> str:
+        if self.shard_id == DEFAULT_SHARD_ID:
+            return JOB_NAME
+        return f"{JOB_NAME}-{self.shard_id}"
+
+
+def shard_weight(shard_id: str, asset: str) -> int:
+    digest = hashlib.md5(f"{shard_id}:{asset}".encode()).hexdigest()
+    return int(digest, 16)
+
+
+def assign_assets(shard_ids: list, assets: list) -> dict:
+    """Spread ``assets`` over ``shard_ids`` with bounded-load rendezvous hashing.
+
+    Each asset goes to its highest-weight shard that still has room, where a
+    shard holds at most ceil(len(assets) / len(shard_ids)) assets. Shard sizes
+    differ by at most one, and assets are placed in a fixed hash order so the
+    assignment is the same on every node.
+    """
+    capacity = -(-len(assets) // len(shard_ids))
+    assigned = {shard_id: [] for shard_id in shard_ids}
+    for asset in sorted(assets, key=lambda a: shard_weight("", a)):
+        ranked = sorted(shard_ids, key=lambda shard_id: shard_weight(shard_id, asset), reverse=True)
+        shard_id = next(s for s in ranked if len(assigned[s]) < capacity)
+        assigned[shard_id].append(asset)
+    return assigned
+
+
+def parse_shard_tiers(spec: str) -> list:
+    """Parse "hot:1:* * * * *;tail:2:*/5 * * * *" into (tier, count, cron) tuples."""
+    tiers = []
+    for entry in filter(None, (part.strip() for part in spec.split(";"))):
+        try:
+            tier, count, cron_expression = entry.split(":", 2)
+            tiers.append((tier.strip(), int(count), cron_expression.strip()))
+        except ValueError:
+            raise ValueError(f"Invalid SHARD_TIERS entry: {entry!r}")
+    return tiers
+
+
+def parse_asset_tiers(spec: str) -> dict:
+    """Parse "BTC:hot,ETH:hot" into {"BTC": "hot", "ETH": "hot"}."""
+    asset_tiers = {}
+    for entry in filter(None, (part.strip() for part in spec.split(","))):
+        asset, _, tier = entry.partition(":")
+        asset_tiers[asset.strip().upper()] = tier.strip()
+    return asset_tiers
+
+
+def unit_assets(unit: str) -> list:
+    return list(FIAT_CURRENCIES) if unit == FIAT_UNIT else [unit]
+
+
+def unit_tier(asset_tiers: dict, unit: str) -> Optional[str]:
+    for asset in [unit] + (FIAT_CURRENCIES if unit == FIAT_UNIT else []):
+        if asset in asset_tiers:
+            return asset_tiers[asset]
+    return None
+
+
+def build_shards(config: Config) -> list:
+    tiers = parse_shard_tiers(config.shard_tiers)
+    if not tiers:
+        return [Shard(DEFAULT_SHARD_ID, config.cron_expression, list(ALL_ASSETS))]
+
+    asset_tiers = parse_asset_tiers(config.asset_tiers)
+    tier_names = [tier for tier, _, _ in tiers]
+    default_tier = tier_names[-1]
+
+    shards = {}
+    shard_ids_by_tier = {}
+    for tier, count, cron_expression in tiers:
+        shard_ids_by_tier[tier] = []
+        for i in range(max(count, 1)):
+            shard_id = f"{tier}-{i}"
+            shards[shard_id] = Shard(shard_id, cron_expression)
+            shard_ids_by_tier[tier].append(shard_id)
+
+    units_by_tier = {tier: [] for tier in tier_names}
+    for unit in SHARD_UNITS:
+        tier = unit_tier(asset_tiers, unit) or default_tier
+        if tier not in units_by_tier:
+            logger.warning(f"Unknown tier {tier!r} for {unit}, using {default_tier!r}")
+            tier = default_tier
+        units_by_tier[tier].append(unit)
+
+    for tier, tier_units in units_by_tier.items():
+        if not tier_units:
+            continue
+        for shard_id, units in assign_assets(shard_ids_by_tier[tier], tier_units).items():
+            units = sorted(units, key=SHARD_UNITS.index)
+            shards[shard_id].assets = [asset for unit in units for asset in unit_assets(unit)]
+
+    for shard in shards.values():
+        if not shard.assets:
+            logger.warning(
+                f"Shard {shard.shard_id} has no assets and will not be scheduled; "
+                f"lower its tier's shard count in SHARD_TIERS"
+            )
+
+    return list(shards.values())
+
+
+def shard_from_job_name(name: str) -> Optional[str]:
+    if name == JOB_NAME:
+        return DEFAULT_SHARD_ID
+    if name.startswith(f"{JOB_NAME}-"):
+        return name[len(JOB_NAME) + 1 :]
+    return None
+
+
+class ShardResolver:
+    """Maps the signed ``job_id`` of a webhook to the shard its job was registered for.
+
+    EasyCron signs only the request body, so the shard is derived from the
+    job rather than from anything the caller could change. Unknown job IDs
+    trigger a refresh from EasyCron, at most once per JOB_REFRESH_INTERVAL.
+    """
+
+    def __init__(self, client: EasyCronClient, shards: list):
+        self.client = client
+        self.shards = {shard.shard_id: shard for shard in shards}
+        self._job_shards = {}
+        self._refreshed_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def add_jobs(self, jobs: list):
+        with self._lock:
+            for job in jobs:
+                shard_id = shard_from_job_name(job.get("name") or "")
+                if shard_id in self.shards:
+                    self._job_shards[job.get("id")] = shard_id
+
+    def resolve(self, job_id: str) -> Optional[str]:
+        if list(self.shards) == [DEFAULT_SHARD_ID]:
+            return DEFAULT_SHARD_ID
+
+        shard_id = self._job_shards.get(job_id)
+        if shard_id is None and time.monotonic() - self._refreshed_at >= JOB_REFRESH_INTERVAL:
+            self._refreshed_at = time.monotonic()
+            self.add_jobs(self.client.list_jobs())
+            shard_id = self._job_shards.get(job_id)
+        return shard_id
+
+    def assets(self, shard_id: str) -> list:
+        return self.shards[shard_id].assets
+
+
+def register_shard_jobs(client: EasyCronClient, config: Config, shards: list) -> list:
+    for existing_job in client.list_jobs():
+        name = existing_job.get("name") or ""
+        if name == JOB_NAME or name.startswith(f"{JOB_NAME}-"):
+            job_id = existing_job.get("id")
+            logger.info(f"Removing existing job: {job_id} ({name})")
+            client.delete_job(job_id)
+
+    jobs = []
+    for shard in shards:
+        if not shard.assets:
+            logger.warning(f"Shard {shard.shard_id} has no assets, not registering")
+            continue
+
+        job = client.register_job(
+            name=shard.job_name,
+            cron_expression=shard.cron_expression,
+            timezone="UTC",
+        )
+        if not job:
+            logger.error(f"Failed to register job for shard {shard.shard_id}")
+            continue
+
+        logger.info(
+            f"Shard {shard.shard_id}: job={job.get('id')}, "
+            f"cron={shard.cron_expression}, assets={','.join(shard.assets)}"
+        )
+        jobs.append(job)
+    return jobs
@@ -1,10 +1,11 @@
 import json
 import logging
 from contextlib import contextmanager
-from typing import Optional
+from datetime import datetime
+from typing import Iterator, Optional
 
 import psycopg2
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 
 from fetcher import AggregatedData
 
@@ -47,12 +48,12 @@ class Database:
             cur.execute(schema_sql)
         logger.info("Schema initialized")
 
-    def save_snapshot(self, data: AggregatedData) -> int:
+    def save_snapshot(self, data: AggregatedData, shard_id: str = "default") -> int:
         sql = """
             INSERT INTO price_snapshots
-                (source, btc_usd, eth_usd, eur_rate, gbp_rate, jpy_rate, raw_data)
+                (source, btc_usd, eth_usd, eur_rate, gbp_rate, jpy_rate, raw_data, shard_id)
             VALUES
-                (%s, %s, %s, %s, %s, %s, %s)
+                (%s, %s, %s, %s, %s, %s, %s, %s)
             RETURNING id
         """
         with self.cursor() as cur:
@@ -66,26 +67,128 @@ class Database:
                     data.rates.gbp,
                     data.rates.jpy,
                     json.dumps(data.raw_data),
+                    shard_id,
                 ),
             )
             row = cur.fetchone()
             snapshot_id = row["id"]
 
-        logger.info(f"Saved snapshot {snapshot_id}")
+        logger.info(f"Saved snapshot {snapshot_id} (shard {shard_id})")
         return snapshot_id
 
-    def get_latest_snapshot(self) -> Optional[dict]:
-        sql = "SELECT * FROM price_snapshots ORDER BY fetched_at DESC LIMIT 1"
+    def get_latest_snapshot(self, shard_id: str = "default") -> Optional[dict]:
+        sql = """
+            SELECT * FROM price_snapshots WHERE shard_id = %s
+            ORDER BY fetched_at DESC LIMIT 1
+        """
         with self.cursor() as cur:
-            cur.execute(sql)
+            cur.execute(sql, (shard_id,))
             return cur.fetchone()
 
-    def get_previous_snapshot(self) -> Optional[dict]:
-        sql = "SELECT * FROM price_snapshots ORDER BY fetched_at DESC LIMIT 1 OFFSET 1"
+    def get_previous_snapshot(self, shard_id: str = "default") -> Optional[dict]:
+        sql = """
+            SELECT * FROM price_snapshots WHERE shard_id = %s
+            ORDER BY fetched_at DESC LIMIT 1 OFFSET 1
+        """
         with self.cursor() as cur:
-            cur.execute(sql)
+            cur.execute(sql, (shard_id,))
             return cur.fetchone()
 
+    def iter_snapshot_pairs(
+        self,
+        chunk_size: int = 10000,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[list]:
+        # Changes are NULL wherever analyze_price_change would skip the pair
+        # (a missing or zero price); each shard's last row before `since` is
+        # pulled in so the first pair in the window still has a predecessor.
+        sql = """
+            SELECT
+                id,
+                fetched_at,
+                prev_btc,
+                btc_usd,
+                CASE WHEN prev_btc <> 0 AND btc_usd <> 0
+                    THEN (btc_usd - prev_btc) / prev_btc * 100 END AS btc_change,
+                prev_eth,
+                eth_usd,
+                CASE WHEN prev_eth <> 0 AND eth_usd <> 0
+                    THEN (eth_usd - prev_eth) / prev_eth * 100 END AS eth_change
+            FROM (
+                SELECT
+                    id,
+                    fetched_at,
+                    fetched_at >= %(since)s::timestamptz AS in_window,
+                    LAG(btc_usd::float8) OVER w AS prev_btc,
+                    btc_usd::float8 AS btc_usd,
+                    LAG(eth_usd::float8) OVER w AS prev_eth,
+                    eth_usd::float8 AS eth_usd
+                FROM (
+                    SELECT id, fetched_at, shard_id, btc_usd, eth_usd
+                    FROM price_snapshots
+                    WHERE fetched_at >= %(since)s::timestamptz
+                        AND fetched_at < %(until)s::timestamptz
+                    UNION ALL
+                    SELECT seed.*
+                    FROM (
+                        SELECT DISTINCT shard_id
+                        FROM price_snapshots
+                        WHERE fetched_at >= %(since)s::timestamptz
+                            AND fetched_at < %(until)s::timestamptz
+                            AND %(since)s::timestamptz > '-infinity'
+                    ) shards
+                    CROSS JOIN LATERAL (
+                        SELECT id, fetched_at, shard_id, btc_usd, eth_usd
+                        FROM price_snapshots p
+                        WHERE p.shard_id = shards.shard_id
+                            AND p.fetched_at < %(since)s::timestamptz
+                        ORDER BY p.fetched_at DESC
+                        LIMIT 1
+                    ) seed
+                ) snapshots
+                WINDOW w AS (PARTITION BY shard_id ORDER BY fetched_at)
+            ) pairs
+            WHERE in_window
+        """
+        params = {
+            "since": since or "-infinity",
+            "until": until or "infinity",
+        }
+        cur = self._conn.cursor(name="replay_snapshots")
+        try:
+            cur.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+            self._conn.commit()
+        except Exception:
+            self._conn.rollback()
+            raise
+        finally:
+            cur.close()
+
+    def save_alerts(self, alerts: list) -> int:
+        # Snapshot/asset pairs that already have an alert are skipped.
+        sql = """
+            INSERT INTO price_alerts
+                (asset, previous_price, current_price, change_pct, snapshot_id, created_at)
+            SELECT v.asset, v.previous_price, v.current_price, v.change_pct, v.snapshot_id, v.created_at
+            FROM (VALUES %s) AS v
+                (asset, previous_price, current_price, change_pct, snapshot_id, created_at)
+            WHERE NOT EXISTS (
+                SELECT 1 FROM price_alerts a
+                WHERE a.snapshot_id = v.snapshot_id AND a.asset = v.asset
+            )
+        """
+        with self.cursor() as cur:
+            execute_values(cur, sql, alerts, page_size=len(alerts))
+            inserted = cur.rowcount
+        logger.info(f"Saved {inserted} of {len(alerts)} alert(s)")
+        return inserted
+
     def save_alert(
         self,
         asset: str,
@@ -116,12 +219,13 @@ class Database:
         fired_at: Optional[str] = None,
         status: str = "pending",
         error_message: Optional[str] = None,
+        shard_id: str = "default",
     ):
         sql = """
             INSERT INTO execution_log
-                (execution_id, job_id, scheduled_at, fired_at, status, error_message)
+                (execution_id, job_id, scheduled_at, fired_at, status, error_message, shard_id)
             VALUES
-                (%s, %s, %s, %s, %s, %s)
+                (%s, %s, %s, %s, %s, %s, %s)
             ON CONFLICT (execution_id) DO UPDATE SET
                 status = EXCLUDED.status,
                 error_message = EXCLUDED.error_message
@@ -129,7 +233,7 @@ class Database:
         with self.cursor() as cur:
             cur.execute(
                 sql,
-                (execution_id, job_id, scheduled_at, fired_at, status, error_message),
+                (execution_id, job_id, scheduled_at, fired_at, status, error_message, shard_id),
             )
 
     def update_execution_status(
@@ -137,8 +241,38 @@ class Database:
     ):
         sql = """
             UPDATE execution_log
-            SET status = %s, error_message = %s
+            SET status = %s,
+                error_message = %s,
+                completed_at = CASE WHEN %s IN ('completed', 'failed') THEN NOW() END
             WHERE execution_id = %s
         """
         with self.cursor() as cur:
-            cur.execute(sql, (status, error_message, execution_id))
+            cur.execute(sql, (status, error_message, status, execution_id))
+
+    def get_shard_latency(self, hours: int = 24) -> list:
+        sql = """
+            SELECT
+                shard_id,
+                COUNT(*) AS executions,
+                COUNT(*) FILTER (WHERE status = 'failed') AS failed,
+                percentile_cont(0.5) WITHIN GROUP (
+                    ORDER BY EXTRACT(EPOCH FROM received_at - scheduled_at) * 1000
+                ) AS delay_p50_ms,
+                percentile_cont(0.95) WITHIN GROUP (
+                    ORDER BY EXTRACT(EPOCH FROM received_at - scheduled_at) * 1000
+                ) AS delay_p95_ms,
+                percentile_cont(0.5) WITHIN GROUP (
+                    ORDER BY EXTRACT(EPOCH FROM completed_at - received_at) * 1000
+                ) AS duration_p50_ms,
+                percentile_cont(0.95) WITHIN GROUP (
+                    ORDER BY EXTRACT(EPOCH FROM completed_at - received_at) * 1000
+                ) AS duration_p95_ms,
+                MAX(EXTRACT(EPOCH FROM completed_at - received_at) * 1000) AS duration_max_ms
+            FROM execution_log
+            WHERE received_at >= NOW() - make_interval(hours => %s)
+            GROUP BY shard_id
+            ORDER BY shard_id
+        """
+        with self.cursor() as cur:
+            cur.execute(sql, (hours,))
+            return cur.fetchall()
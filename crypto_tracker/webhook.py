@@ -2,21 +2,83 @@ import hashlib
 import hmac
 import json
 import logging
+from typing import Optional
 
-from flask import Flask, jsonify, request
+from flask import Flask, g, jsonify, request
 
 from analyzer import analyze_price_change
 from fetcher import fetch_all
+from profiler import SamplingProfiler
+from shards import DEFAULT_SHARD_ID, ShardResolver
 from store import Database
 
 logger = logging.getLogger(__name__)
 
 
-def create_app(db: Database, webhook_secret: str) -> Flask:
+def create_app(
+    db: Database,
+    webhook_secret: str,
+    shard_resolver: Optional[ShardResolver] = None,
+    profiler: Optional[SamplingProfiler] = None,
+    admin_token: str = "",
+) -> Flask:
     app = Flask(__name__)
     app.config["db"] = db
     app.config["webhook_secret"] = webhook_secret
 
+    # Without env settings or an admin token profiling can never turn on, so
+    # no hooks are installed and requests take exactly the unprofiled path.
+    if profiler is not None and (profiler.enabled or admin_token):
+
+        @app.before_request
+        def start_profile():
+            profiler.refresh()
+            if profiler.enabled and request.endpoint == "webhook":
+                g.profile = profiler.start()
+
+        @app.teardown_request
+        def stop_profile(exc):
+            session = g.pop("profile", None)
+            if session is not None:
+                profiler.stop(session)
+
+    if profiler is not None and admin_token:
+
+        @app.route("/admin/profiling", methods=["GET", "POST"])
+        def profiling():
+            if not verify_admin_token(admin_token, request.headers.get("Authorization", "")):
+                return jsonify({"error": "unauthorized"}), 401
+
+            if request.method == "POST":
+                settings = request.get_json(silent=True)
+                if not isinstance(settings, dict):
+                    return jsonify({"error": "expected a JSON object"}), 400
+
+                try:
+                    every_n = int(settings.get("every_n", profiler.every_n))
+                    slow_ms = int(settings.get("slow_ms", profiler.slow_ms))
+                except (TypeError, ValueError):
+                    return jsonify({"error": "every_n and slow_ms must be integers"}), 400
+
+                try:
+                    profiler.save_settings(every_n=every_n, slow_ms=slow_ms)
+                except OSError as e:
+                    logger.error(f"Failed to save profiler settings: {e}")
+                    return jsonify({"error": "failed to save settings"}), 500
+            else:
+                profiler.refresh(force=True)
+
+            return jsonify(profiler.status())
+
+        @app.route("/admin/profiling/summary", methods=["GET"])
+        def profiling_summary():
+            if not verify_admin_token(admin_token, request.headers.get("Authorization", "")):
+                return jsonify({"error": "unauthorized"}), 401
+
+            minutes = request.args.get("minutes", 60, type=int)
+            limit = request.args.get("limit", 20, type=int)
+            return jsonify(profiler.summary(minutes=minutes, limit=limit))
+
     @app.route("/health", methods=["GET"])
     def health():
         return jsonify({"status": "ok"})
@@ -40,8 +102,16 @@ def create_app(db: Database, webhook_secret: str) -> Flask:
         job_id = payload.get("job_id", "unknown")
         scheduled_at = payload.get("scheduled_at")
         fired_at = payload.get("fired_at")
+        shard_id = DEFAULT_SHARD_ID
+        if shard_resolver is not None:
+            shard_id = shard_resolver.resolve(job_id)
+            if shard_id is None:
+                logger.warning(f"No shard registered for job {job_id}")
+                return jsonify({"error": f"unknown job {job_id}"}), 400
+
+        logger.info(f"Received webhook: execution={execution_id}, job={job_id}, shard={shard_id}")
 
-        logger.info(f"Received webhook: execution={execution_id}, job={job_id}")
+        tag_profile(execution_id=execution_id, job_id=job_id, shard_id=shard_id)
 
         # Log the execution
         db.log_execution(
@@ -50,23 +120,26 @@ def create_app(db: Database, webhook_secret: str) -> Flask:
             scheduled_at=scheduled_at,
             fired_at=fired_at,
             status="processing",
+            shard_id=shard_id,
         )
 
         try:
-            # Fetch data from APIs
-            data = fetch_all()
+            # Fetch only this shard's assets
+            data = fetch_all(shard_resolver.assets(shard_id) if shard_resolver else None)
 
             # Save to database
-            snapshot_id = db.save_snapshot(data)
+            snapshot_id = db.save_snapshot(data, shard_id)
+            tag_profile(snapshot_id=snapshot_id)
 
             # Analyze for price changes
-            analyze_price_change(db, snapshot_id)
+            analyze_price_change(db, snapshot_id, shard_id)
 
             # Update execution status
             db.update_execution_status(execution_id, "completed")
 
             result = {
                 "status": "ok",
+                "shard_id": shard_id,
                 "snapshot_id": snapshot_id,
                 "btc_usd": data.crypto.btc_usd,
                 "eth_usd": data.crypto.eth_usd,
@@ -83,6 +156,19 @@ def create_app(db: Database, webhook_secret: str) -> Flask:
     return app
 
 
+def tag_profile(**tags):
+    session = g.get("profile")
+    if session is not None:
+        session.tags.update(tags)
+
+
+def verify_admin_token(token: str, authorization: str) -> bool:
+    scheme, _, provided = authorization.partition(" ")
+    if scheme.lower() != "bearer" or not provided:
+        return False
+    return hmac.compare_digest(token, provided)
+
+
 def verify_signature(secret: str, body: bytes, signature: str) -> bool:
     if not signature:
         return False
@@ -8,6 +8,8 @@ from config import Config
 from store import Database
 from webhook import create_app
 from easycron import EasyCronClient
+from profiler import SamplingProfiler
+from shards import ShardResolver, build_shards, register_shard_jobs
 
 load_dotenv()
 
@@ -30,22 +32,22 @@ if schema_path.exists():
     except Exception as e:
         logger.info(f"Schema already exists or error: {e}")
 
+shards = build_shards(config)
+client = EasyCronClient(config)
+shard_resolver = ShardResolver(client, shards)
+
 if os.environ.get("REGISTER_JOB", "true").lower() == "true":
-    client = EasyCronClient(config)
     if client.health_check():
-        existing_jobs = client.list_jobs()
-        for job in existing_jobs:
-            if job.get("name") == "crypto-tracker":
-                client.delete_job(job.get("id"))
-
-        job = client.register_job(
-            name="crypto-tracker",
-            cron_expression=config.cron_expression,
-            timezone="UTC",
-        )
-        if job:
-            logger.info(f"Registered job: {job.get('id')}")
+        jobs = register_shard_jobs(client, config, shards)
+        shard_resolver.add_jobs(jobs)
+        logger.info(f"Registered {len(jobs)} job(s) for {len(shards)} shard(s)")
     else:
         logger.warning("EasyCron not available, skipping job registration")
 
-app = create_app(db, config.webhook_secret)
+app = create_app(
+    db,
+    config.webhook_secret,
+    shard_resolver,
+    profiler=SamplingProfiler.from_config(config),
+    admin_token=config.admin_token,
+)